@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 15 14:03:21 2026
+
+@author: Brian Chung
+Seeded checks of the shape-and-count soil profiles. Both models store their
+profile as one row per distinct particle shape together with the number of
+particles of that shape, rather than one row per particle. These checks
+expand the shapes back into individual particles and make sure that the
+number of particles and the characteristics calculated from the shapes match
+the ones calculated particle by particle.
+
+Run with: python checkShapes.py
+"""
+
+import numpy as np
+from numpy.random import default_rng
+import model
+import linearGrowthModel
+
+
+def expand(profile, keys):
+    """
+    Expands a shape-and-count soil profile into one entry per particle.
+
+    Parameters
+    ----------
+    profile : dict
+        A soil profile with a "count" array.
+    keys : list of str
+        The columns to expand.
+
+    Returns
+    -------
+    A list of float64 arrays, one per key, with one entry per particle.
+
+    """
+    return [np.repeat(profile[key].astype(np.float64), profile["count"])
+            for key in keys]
+
+
+def checkShapes(profile, keys):
+    """
+    Checks that every shape in a profile has at least 1 particle and that no
+    2 shapes have the same sides, i.e. that duplicate shapes were merged.
+    """
+    assert (profile["count"] > 0).all()
+    shapes = np.stack([profile[key] for key in keys], axis=1)
+    assert np.unique(shapes, axis=0).shape[0] == shapes.shape[0]
+
+
+def checkModel(end=12, seed=0):
+    """
+    Checks model.py: the number of particles doubles every time step, and the
+    specific surface area and mean volume match a per-particle calculation.
+    """
+    rng = default_rng(seed)
+    pm = model.particle(1e4, 100, 100, 2.1)
+    profile = {"d1": np.array([pm.d1], dtype=np.float32),
+               "d2": np.array([pm.d2], dtype=np.float32),
+               "d3": np.array([pm.d3], dtype=np.float32),
+               "density": np.array([pm.density], dtype=np.float32),
+               "count": np.array([1], dtype=np.int64)}
+    for timeStep in range(1, end + 1):
+        profile, creationTime = model.divideParticles(profile, rng)
+        checkShapes(profile, ["d1", "d2", "d3", "density"])
+        specificSA, meanVolume, num, calcTime = model.characteristics(profile)
+        assert num == 2**timeStep
+        assert profile["count"].sum() == 2**timeStep
+
+        d1, d2, d3 = expand(profile, ["d1", "d2", "d3"])
+        assert d1.shape[0] == 2**timeStep
+        SA = (2*d1*d2) + (2*d2*d3) + (2*d3*d1)
+        volume = d1*d2*d3
+        assert np.isclose(specificSA, SA.sum(), rtol=1e-12)
+        assert np.isclose(meanVolume, volume.mean(), rtol=1e-12)
+        # Every particle is bisected at every time step, so all particles
+        # have the same volume, and bisecting never changes the total volume
+        assert np.allclose(volume, pm.volume/2**timeStep, rtol=1e-12)
+        assert np.isclose(volume.sum(), pm.volume, rtol=1e-12)
+
+    output = model.run(pm, end, default_rng(seed))
+    assert (output.numberOfParticles == 2**output.timeStep).all()
+    try:
+        model.run(pm, 63, default_rng(seed))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("model.run() accepted end = 63")
+
+
+def checkLinearGrowthModel(timeStep=60, seed=0):
+    """
+    Checks linearGrowthModel.py: the number of particles follows growth(),
+    the total volume is conserved, and the specific surface area, mean mass,
+    and mean volume match a per-particle calculation.
+    """
+    rng = default_rng(seed)
+    side1, side2, side3, density = 1e4, 100, 100, 2.1
+    profile = linearGrowthModel.parentMaterial(side1, side2, side3, density)
+    pmVolume = side1*side2*side3
+    numArray = np.empty(timeStep, dtype=np.int64)
+    num = 1
+    for index in range(timeStep):
+        newNum = linearGrowthModel.growth(num)
+        dividedSide = rng.integers(1, 3, endpoint=True)
+        profile = linearGrowthModel.createParticles(profile, newNum,
+                                                    dividedSide, rng)
+        num += newNum
+        numArray[index] = num
+        checkShapes(profile, ["side1", "side2", "side3", "density"])
+        assert profile["count"].sum() == num
+
+        s1, s2, s3, dens = expand(profile,
+                                  ["side1", "side2", "side3", "density"])
+        SA = (2*s1*s2) + (2*s2*s3) + (2*s1*s3)
+        volume = s1*s2*s3
+        SAsum, massSum, volumeSum = linearGrowthModel.sumProfile(
+            profile["side1"], profile["side2"], profile["side3"],
+            profile["density"], profile["count"])
+        assert np.isclose(SAsum, SA.sum(), rtol=1e-12)
+        assert np.isclose(massSum, (dens*volume).sum(), rtol=1e-12)
+        assert np.isclose(volumeSum, volume.sum(), rtol=1e-12)
+        # Dividing particles never changes the total volume
+        assert np.isclose(volumeSum, pmVolume, rtol=1e-12)
+
+    output = linearGrowthModel.run(timeStep, side1, side2, side3, density,
+                                   rng=default_rng(seed))
+    assert (output.numOfParticles.values == numArray).all()
+    assert np.allclose(output.meanParticleVolume*output.numOfParticles,
+                       pmVolume, rtol=1e-12)
+
+
+if __name__ == "__main__":
+    checkModel()
+    checkLinearGrowthModel()
+    print("All checks passed")
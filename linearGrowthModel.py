@@ -12,21 +12,25 @@ of this revision is to cut down on the run time, making running the model
 more feasible.
 """
 import pandas as pd
-from numpy.random import default_rng
+from concurrent.futures import ProcessPoolExecutor
+from numpy.random import default_rng, SeedSequence
 import numpy as np
-
-rng = default_rng()
+from soilKernels import divideShapes, sumProfile
 
 
 # First of all, let's create a parent material. Parent material should have
-# 3 sides and a specific density. From this information, the volume and mass
-# will be calculated.
+# 3 sides and a specific density. The volume and mass of each particle are
+# calculated from these when the characteristics of a profile are needed.
 def parentMaterial(side1, side2, side3, density):
     """
-    Creates a dataframe of a single row representing the parent material.
-    This dataframe will be used to create the subsequent soil profile. Units
-    must remain constant, and should the units be different, then the end user
-    needs to manually do conversions to give them the same units.
+    Creates a soil profile of a single particle representing the parent
+    material. This profile will be used to create the subsequent soil profile.
+    Units must remain constant, and should the units be different, then the
+    end user needs to manually do conversions to give them the same units.
+
+    A soil profile is a dict of parallel numpy arrays under the keys "side1",
+    "side2", "side3", "density", and "count". Each entry is a distinct
+    particle shape, and "count" is the number of particles with that shape.
 
     Parameters
     ----------
@@ -41,105 +45,90 @@ def parentMaterial(side1, side2, side3, density):
 
     Returns
     -------
-    A dataframe containing the parent material.
+    A soil profile containing the parent material.
 
     """
-    volume = side1*side2*side3
-    mass = volume*density
-    SA = (2*side1*side2) + (2*side2*side3) + (2*side1*side3)
-    values = [side1, side2, side3, density, volume, mass, SA]
-    # pm = pd.DataFrame(data=values, columns=["side1", "side2", "side3",
-    #                                         "density", "volume", "mass", "SA"])
-    pm = pd.DataFrame(data={"id": [1], "side1": [side1], "side2": [side2],
-                            "side3": [side3], "density": [density],
-                            "volume": [volume], "mass": [mass], "SA": [SA]})
+    # The sides and density are stored as float32 to halve the memory used
+    # by the profile. The kernels in soilKernels upcast them to float64
+    # before computing face areas, volumes, masses, and their sums.
+    pm = {"side1": np.array([side1], dtype=np.float32),
+          "side2": np.array([side2], dtype=np.float32),
+          "side3": np.array([side3], dtype=np.float32),
+          "density": np.array([density], dtype=np.float32),
+          "count": np.array([1], dtype=np.int64)}
     return pm
 
 
-# Now, let's create a growth function
-def growth(soilProfile):
+# Now, let's create a growth function. A profile with at most
+# growthThresholds[i] particles, and more than growthThresholds[i - 1], gets
+# growthValues[i] new particles. Profiles with more than 1000 particles get
+# the last value.
+growthThresholds = np.array([10, 20, 50, 100, 200, 300, 1000])
+growthValues = np.array([1, 10, 20, 50, 100, 200, 300, 1000])
+
+
+def growth(existingParticles):
     """
     This growth function calculates the number of new soil particles that will
-    be created at a time step.
+    be created at a time step. Since it only depends on the number of
+    particles, the number of particles at every time step is known before the
+    model is run.
 
     Parameters
     ----------
-    soilProfile : Pandas dataframe
-        A dataframe that contains data on all the individual particles at a
-        particular time step prior to the creation of new particles.
+    existingParticles : int
+        The number of particles in the soil profile at a particular time step
+        prior to the creation of new particles.
 
     Returns
     -------
     A number representing the number of new particles that will be created.
 
     """
-    existingParticles = soilProfile.shape[0]
-    if existingParticles <= 10:
-        newParticles = 1
-    elif existingParticles <= 20 and existingParticles > 10:
-        newParticles = 10
-    elif existingParticles <= 50 and existingParticles > 20:
-        newParticles = 20
-    elif existingParticles <= 100 and existingParticles > 50:
-        newParticles = 50
-    elif existingParticles <= 200 and existingParticles > 100:
-        newParticles = 100
-    elif existingParticles <= 300 and existingParticles > 200:
-        newParticles = 200
-    elif existingParticles <= 1000 and existingParticles > 300:
-        newParticles = 300
-    elif existingParticles > 1000:
-        newParticles = 1000
+    bracket = np.searchsorted(growthThresholds, existingParticles,
+                              side="left")
+    newParticles = int(growthValues[bracket])
     return newParticles
 
 
-def createParticles(soilProfile):
+def createParticles(soilProfile, newNum, dividedSide, rng):
     """
     This function will be run iteratively, where each iteration is a particular
     time step in which a new soil profile will be created. Creates a new soil
     profile from an existing soil profile at a particular time step.
 
+    The particles to divide are drawn without replacement from all the
+    particles in the profile, so the number drawn from each shape follows a
+    multivariate hypergeometric distribution.
+
     Parameters
     ----------
-    soilProfile : Pandas dataframe
+    soilProfile : dict
         The existing soil profile at a particular time step.
+    newNum : int
+        The number of particles that will be divided at this time step, as
+        calculated by growth().
+    dividedSide : int
+        The side (1, 2, or 3) along which all the new particles at this time
+        step are divided.
+    rng : numpy Generator
+        The random number generator used to choose the particles to divide.
 
     Returns
     -------
-    A pandas dataframe that represents the new soil profile at this time step.
+    A dict of arrays that represents the new soil profile at this time step.
 
     """
-    newNum = growth(soilProfile)
-    particlesToDivide = soilProfile.sample(newNum, axis=0)
-    oldSoilProfile = soilProfile.copy()
-    particlesToDivideId = str(particlesToDivide.id.tolist())
-    queryStr = "id != {}".format(particlesToDivideId)
-    oldSoilProfile = oldSoilProfile.query(queryStr)
-    dividedSide = rng.integers(1, 3, endpoint=True)
-    if dividedSide == 1:
-        particlesToDivide.side1 = particlesToDivide.side1/2
-    elif dividedSide == 2:
-        particlesToDivide.side2 = particlesToDivide.side2/2
-    elif dividedSide == 3:
-        particlesToDivide.side3 = particlesToDivide.side3/2
-    particlesToDivide.volume = (particlesToDivide.side1
-                                * particlesToDivide.side2
-                                * particlesToDivide.side3)
-    particlesToDivide.mass = particlesToDivide.density*particlesToDivide.volume
-    particlesToDivide.SA = ((2*particlesToDivide.side1*particlesToDivide.side2)
-                            + (2*particlesToDivide.side2
-                               * particlesToDivide.side3)
-                            + (2*particlesToDivide.side1
-                               * particlesToDivide.side3))
-    soilParticlesList = [oldSoilProfile, particlesToDivide, particlesToDivide]
-    newProfile = pd.concat(soilParticlesList, axis=0)
-    particleNum = newProfile.shape[0]
-    newProfile.id = np.arange(1, particleNum + 1)
-    newProfile = newProfile.reset_index(drop=True)
+    picks = rng.multivariate_hypergeometric(soilProfile["count"], newNum)
+
+    columns = ["side1", "side2", "side3", "density", "count"]
+    newColumns = divideShapes(*[soilProfile[key] for key in columns],
+                              picks, dividedSide)
+    newProfile = dict(zip(columns, newColumns))
     return newProfile
 
 
-def run(timeStep, side1, side2, side3, density):
+def run(timeStep, side1, side2, side3, density, rng=None):
     """
     Runs the model iteratively, producing a new soil profile at each time step.
     Calculations will be conducted on each new soil profile, with the variables
@@ -159,6 +148,10 @@ def run(timeStep, side1, side2, side3, density):
         The length of the third side of the parent material.
     density : numeric
         The density of the parent material.
+    rng : numpy Generator, optional
+        The random number generator used to run the model. Pass a seeded
+        generator, e.g. default_rng(42), to make a run reproducible. Defaults
+        to a new, unseeded generator.
 
     Returns
     -------
@@ -166,26 +159,78 @@ def run(timeStep, side1, side2, side3, density):
     at each time step.
 
     """
+    if rng is None:
+        rng = default_rng()
     pm = parentMaterial(side1, side2, side3, density)
     oldProfile = pm
     timeStep = int(timeStep)
-    zerosArray = np.zeros(timeStep)
-    outputDF = pd.DataFrame({"timeStep": zerosArray,
-                             "numOfParticles": zerosArray,
-                             "meanParticleMass": zerosArray,
-                             "meanParticleVolume": zerosArray,
-                             "specificSA": zerosArray})
-    for index, row in outputDF.iterrows():
-        outputDF.loc[index, "timeStep"] = index + 1
-        newProfile = createParticles(oldProfile)
-        meanDF = newProfile.mean()
-        outputDF.loc[index, "numOfParticles"] = newProfile.id.max()
-        outputDF.loc[index, "specificSA"] = newProfile.SA.sum()
-        outputDF.loc[index, "meanParticleMass"] = meanDF.mass
-        outputDF.loc[index, "meanParticleVolume"] = meanDF.volume
+    massArray = np.zeros(timeStep)
+    volumeArray = np.zeros(timeStep)
+    SAArray = np.zeros(timeStep)
+    # The number of particles divided at each time step only depends on the
+    # number of particles, so it's worked out before running the model
+    newNumArray = np.empty(timeStep, dtype=np.int64)
+    num = 1
+    for index in range(timeStep):
+        newNumArray[index] = growth(num)
+        num += newNumArray[index]
+    numArray = 1 + np.cumsum(newNumArray)
+    # The side that gets divided at each time step is drawn all at once
+    dividedSides = rng.integers(1, 3, endpoint=True, size=timeStep)
+    for index in range(timeStep):
+        newProfile = createParticles(oldProfile, newNumArray[index],
+                                     dividedSides[index], rng)
+        SAsum, massSum, volumeSum = sumProfile(newProfile["side1"],
+                                               newProfile["side2"],
+                                               newProfile["side3"],
+                                               newProfile["density"],
+                                               newProfile["count"])
+        num = numArray[index]
+        SAArray[index] = SAsum
+        massArray[index] = massSum/num
+        volumeArray[index] = volumeSum/num
         oldProfile = newProfile
 
+    outputDF = pd.DataFrame({"timeStep": np.arange(1, timeStep + 1),
+                             "numOfParticles": numArray,
+                             "meanParticleMass": massArray,
+                             "meanParticleVolume": volumeArray,
+                             "specificSA": SAArray})
     return outputDF
 
 
+def sweep(parameters, seed=None, maxWorkers=None):
+    """
+    Runs the model once for each set of parameters, spreading the runs across
+    separate processes. Each run is independent of the others, so a parameter
+    sweep scales with the number of CPU cores. On Windows, the script calling
+    this function must guard the call with if __name__ == "__main__".
+
+    Parameters
+    ----------
+    parameters : list of tuples
+        Each tuple holds the arguments of a single run in the same order as
+        run(): (timeStep, side1, side2, side3, density).
+    seed : int, optional
+        The seed for the whole sweep. Each run gets its own independent random
+        number generator spawned from this seed, so a sweep with the same seed
+        and parameters gives the same output regardless of maxWorkers.
+        Defaults to fresh entropy from the operating system.
+    maxWorkers : int, optional
+        The number of processes to run the model in. Defaults to the number of
+        CPUs on the machine.
+
+    Returns
+    -------
+    A list of pandas dataframes, one for each set of parameters and in the
+    same order, containing the output of run().
+
+    """
+    rngs = [default_rng(childSeed)
+            for childSeed in SeedSequence(seed).spawn(len(parameters))]
+    with ProcessPoolExecutor(max_workers=maxWorkers) as executor:
+        outputs = list(executor.map(run, *zip(*parameters), rngs))
+    return outputs
+
+
 # 500 iterations is good for me
@@ -28,8 +28,7 @@ import pandas as pd
 import numpy as np
 from numpy.random import default_rng
 from time import time
-
-rng = default_rng()
+from soilKernels import bisect, sumSurfaceAreaAndVolume
 
 
 class particle:
@@ -42,63 +41,52 @@ class particle:
         self.volume = side1*side2*side3
         self.mass = density*self.volume
 
-    def divide(self):
-        """
-        Divides a particle into 2 new particles. A side will randomly be chosen
-        to divide the particle, and the particle will be divided by a bisector
-        down the middle of that side.
-
-        Returns
-        -------
-        2 new particles.
-
-        """
-        number = rng.integers(1, 3, endpoint=True)
-        if number == 1:
-            newSide1 = self.d1/2
-            newParticle1 = particle(newSide1, self.d2, self.d3, self.density)
-            newParticle2 = particle(newSide1, self.d2, self.d3, self.density)
-        elif number == 2:
-            newSide2 = self.d2/2
-            newParticle1 = particle(self.d1, newSide2, self.d3, self.density)
-            newParticle2 = particle(self.d1, newSide2, self.d3, self.density)
-        elif number == 3:
-            newSide3 = self.d3/2
-            newParticle1 = particle(self.d1, self.d2, newSide3, self.density)
-            newParticle2 = particle(self.d1, self.d2, newSide3, self.density)
-        return newParticle1, newParticle2
-
-
-def divideParticles(oldParticles):
+
+def divideParticles(oldProfile, rng):
     """
     Divides all the particles at a particular time step into new particles.
+    Each particle randomly chooses one of its sides, and is bisected down the
+    middle of that side into 2 identical new particles.
+
+    Particles with identical sides are stored as a single shape with a count,
+    so the profile grows with the number of distinct shapes rather than with
+    the number of particles. Since every bisection halves one of the 3 sides,
+    there are at most (t + 1)(t + 2)/2 shapes at time step t. Each particle
+    of a shape still chooses its side independently, so the number bisected
+    along each side is drawn from a multinomial distribution.
 
     Parameters
     ----------
-    oldParticles : tuple
-        The list of particles at a particular time step. All of the particles
-        in this list will be divided.
+    oldProfile : dict
+        The soil profile at a particular time step, stored as parallel numpy
+        arrays under the keys "d1", "d2", "d3", "density", and "count", with
+        one entry per particle shape. All of the particles in this profile
+        will be divided.
+    rng : numpy Generator
+        The random number generator used to choose the sides.
 
     Returns
     -------
-    A new tuple of divided particles at this time step, representing the new
-    soil profile, and the amount of time it takes the model to create this new
-    soil profile to measure model performance.
+    A new dict of arrays of divided particles at this time step, representing
+    the new soil profile, and the amount of time it takes the model to create
+    this new soil profile to measure model performance.
 
     """
     start = time()
-    newParticles = ()  # empty tuple
-    for item in oldParticles:
-        dividedParticles = item.divide()  # Since it returns multiple items
-        # but the items are not each assigned a name, these items are put into
-        # a single tuple. Hence, this method now returns a single tuple
-        newParticles = newParticles + dividedParticles
+    splits = rng.multinomial(oldProfile["count"], [1/3, 1/3, 1/3])
+    newD1, newD2, newD3, newDensity, newCount = bisect(oldProfile["d1"],
+                                                       oldProfile["d2"],
+                                                       oldProfile["d3"],
+                                                       oldProfile["density"],
+                                                       splits)
+    newProfile = {"d1": newD1, "d2": newD2, "d3": newD3,
+                  "density": newDensity, "count": newCount}
     end = time()
     profileCreationTime = end - start
-    return newParticles, profileCreationTime
+    return newProfile, profileCreationTime
 
 
-def characteristics(particles):
+def characteristics(profile):
     """
     At a particular time step, after all the old particles are divided, this
     calculates the physical characteristics of the new soil profile with new
@@ -110,9 +98,10 @@ def characteristics(particles):
 
     Parameters
     ----------
-    particles : tuple
+    profile : dict
         The new soil profile with new particles created at the end of this
-        time step. Characteristics of this will be calculated.
+        time step, as returned by divideParticles(). Characteristics of this
+        will be calculated.
 
     Returns
     -------
@@ -123,20 +112,15 @@ def characteristics(particles):
 
     """
     start = time()
-    numOfParticles = len(particles)
-    SAarray = np.array([])
-    volumeArray = np.array([])
-    for particle in particles:
-        SAarray = np.append(SAarray, particle.surfaceArea)
-        volumeArray = np.append(volumeArray, particle.volume)
-    specificSA = np.sum(SAarray)
-    meanVolume = np.mean(volumeArray)
+    specificSA, volumeSum, numOfParticles = sumSurfaceAreaAndVolume(
+        profile["d1"], profile["d2"], profile["d3"], profile["count"])
+    meanVolume = volumeSum/numOfParticles
     end = time()
     calculationTime = end - start
     return specificSA, meanVolume, numOfParticles, calculationTime
 
 
-def run(parentMaterial, end):
+def run(parentMaterial, end, rng=None):
     """
     Runs a simulation of the model over a specific time interval, the ending
     time step of which is specified by the "end" parameter. Produces a pandas
@@ -148,7 +132,12 @@ def run(parentMaterial, end):
     parentMaterial : particle object
         The parent material that will be divided with each time step.
     end : int
-        The ending time step
+        The ending time step. The number of particles doubles every time step
+        and is stored as a 64-bit integer, so end can be at most 62.
+    rng : numpy Generator, optional
+        The random number generator used to run the model. Pass a seeded
+        generator, e.g. default_rng(42), to make a run reproducible. Defaults
+        to a new, unseeded generator.
 
     Returns
     -------
@@ -156,62 +145,89 @@ def run(parentMaterial, end):
     profile created at the end of each time step.
 
     """
-    # Creating the empty output dataframe to be filled in later
-    timeSteps = np.arange(1, end + 1)
+    if end > 62:
+        raise ValueError("end must be at most 62, since the 2**end particles "
+                         "at the final time step must fit in a 64-bit "
+                         "integer, but got {}".format(end))
+    if rng is None:
+        rng = default_rng()
+
+    # Creating the empty arrays to be filled in with the characteristics of
+    # the new soil profile created at the end of each time step
     emptySpecificSA = np.zeros(end)
     emptyVolume = np.zeros(end)
     emptyPartNum = np.zeros(end)
     creationTimeArray = np.zeros(end)
     calculationTimeArray = np.zeros(end)
-    dfFormat = {"timeStep": timeSteps, "numberOfParticles": emptyPartNum,
-                "specificSurfaceArea": emptySpecificSA,
-                "particleVolume": emptyVolume,
-                "modelCreationTime": creationTimeArray,
-                "modelCalculationTime": calculationTimeArray}
-    outputDF = pd.DataFrame(data=dfFormat)
+    cumuCreationTimeArray = np.zeros(end)
+    cumuCalcTimeArray = np.zeros(end)
+    cumuModelTimeArray = np.zeros(end)
 
-    # Populating the dataframe with characteristics of the new soil profile
+    # Populating the arrays with characteristics of the new soil profile
     # after each time step
-    oldProfile = (parentMaterial,)
-    for index, row in outputDF.iterrows():
-        newProfile, creationTime = divideParticles(oldProfile)
+    # The sides and density are stored as float32 to halve the memory used
+    # by the profile. Bisecting only ever halves a side, which float32 does
+    # exactly.
+    oldProfile = {"d1": np.array([parentMaterial.d1], dtype=np.float32),
+                  "d2": np.array([parentMaterial.d2], dtype=np.float32),
+                  "d3": np.array([parentMaterial.d3], dtype=np.float32),
+                  "density": np.array([parentMaterial.density],
+                                      dtype=np.float32),
+                  "count": np.array([1], dtype=np.int64)}
+
+    # Calls the compiled kernels once on the parent material before anything
+    # is timed, so that compiling them (or loading them from Numba's cache)
+    # isn't counted as part of the first time step's creation and
+    # calculation times
+    bisect(oldProfile["d1"], oldProfile["d2"], oldProfile["d3"],
+           oldProfile["density"], np.zeros((1, 3), dtype=np.int64))
+    sumSurfaceAreaAndVolume(oldProfile["d1"], oldProfile["d2"],
+                            oldProfile["d3"], oldProfile["count"])
+
+    cumuCreationTime = 0.0
+    cumuCalcTime = 0.0
+    for index in range(end):
+        newProfile, creationTime = divideParticles(oldProfile, rng)
         specificSA, particleVolume, num, calcTime = characteristics(newProfile)
 
         # Puts in characteristics of the soil profile created at a time step
-        outputDF.loc[index, "specificSurfaceArea"] = specificSA
-        outputDF.loc[index, "particleVolume"] = particleVolume
-        outputDF.loc[index, "numberOfParticles"] = num
+        emptySpecificSA[index] = specificSA
+        emptyVolume[index] = particleVolume
+        emptyPartNum[index] = num
         oldProfile = newProfile
 
         # Puts in times used to create and calculate the characteristics of
         # the soil profile to measure model performance
-        outputDF.loc[index, "modelCreationTime"] = creationTime
-        '''The amount of time it takes the model to create this particular
-        soil profile.'''
-        cumuCreationTime = outputDF["modelCreationTime"].sum()
-        '''Calculates the total amount of time it takes the model to create all
-        the soil profiles up till now. Sums up the creation time from the
-        initial time step all the way to this current time step that's being
-        looped through'''
-        outputDF.loc[index, "cumuCreationTime"] = cumuCreationTime
-
-        outputDF.loc[index, "modelCalculationTime"] = calcTime
-        '''The amount of time it takes the model to perform calculations on
-        this particular soil profile.'''
-        cumuCalcTime = outputDF["modelCalculationTime"].sum()
-        '''Calculates the total amount of time it takes the model to perform
-        calculations for all soil profiles from the initial time step to the
-        one that's being looped through.'''
-        outputDF.loc[index, "cumuCalcTime"] = cumuCalcTime
-
-        outputDF.loc[index, "modelTime"] = creationTime + calcTime
-        '''Calculates the total amount of time it takes the model to work
-        through this new profile, from creating it to performing calculations
-        on it.'''
-        cumuModelTime = outputDF["modelTime"].sum(skipna=True)
-        '''Calculates the amount of time it takes the model to create all the
-        soil profiles up to the one that's being looped through and perform
-        calculations on them.'''
-        outputDF.loc[index, "cumuModelTime"] = cumuModelTime
-
+        creationTimeArray[index] = creationTime
+        cumuCreationTime += creationTime
+        '''Running total of the amount of time it takes the model to create all
+        the soil profiles from the initial time step up till now.'''
+        cumuCreationTimeArray[index] = cumuCreationTime
+
+        calculationTimeArray[index] = calcTime
+        cumuCalcTime += calcTime
+        '''Running total of the amount of time it takes the model to perform
+        calculations for all soil profiles from the initial time step up till
+        now.'''
+        cumuCalcTimeArray[index] = cumuCalcTime
+
+        cumuModelTimeArray[index] = cumuCreationTime + cumuCalcTime
+        '''The amount of time it takes the model to create all the soil
+        profiles up till now and perform calculations on them.'''
+
+    # Creating the output dataframe once all the time steps are done
+    timeSteps = np.arange(1, end + 1)
+    modelTimeArray = creationTimeArray + calculationTimeArray
+    '''The total amount of time it takes the model to work through each new
+    profile, from creating it to performing calculations on it.'''
+    dfFormat = {"timeStep": timeSteps, "numberOfParticles": emptyPartNum,
+                "specificSurfaceArea": emptySpecificSA,
+                "particleVolume": emptyVolume,
+                "modelCreationTime": creationTimeArray,
+                "modelCalculationTime": calculationTimeArray,
+                "cumuCreationTime": cumuCreationTimeArray,
+                "cumuCalcTime": cumuCalcTimeArray,
+                "modelTime": modelTimeArray,
+                "cumuModelTime": cumuModelTimeArray}
+    outputDF = pd.DataFrame(data=dfFormat)
     return outputDF
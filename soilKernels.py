@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 15 09:12:47 2026
+
+@author: Brian Chung
+Compiled Numba kernels used by model.py and linearGrowthModel.py to create
+new soil profiles and calculate their characteristics.
+
+The kernels live in their own module and are compiled with cache=True, so
+Numba writes the compiled machine code to __pycache__ next to this file.
+Only the first run on a machine, or the first run after this file changes,
+waits for compilation; every later run, including reruns of runtime.py,
+loads the cached kernels.
+"""
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True, fastmath=True)
+def bisect(d1, d2, d3, density, splits):
+    """
+    Compiled kernel behind model.divideParticles(). Bisects every group of
+    identical particles, and merges new particles that end up with the same
+    shape into a single group.
+
+    Parameters
+    ----------
+    d1, d2, d3, density : numpy arrays
+        The sides and densities of the old particle shapes.
+    splits : 2D numpy array
+        splits[i, k] is the number of particles of shape i that are bisected
+        along side k + 1.
+
+    Returns
+    -------
+    The sides, densities, and counts of the new particle shapes.
+
+    """
+    numOfShapes = d1.shape[0]
+    newD1 = np.empty(3*numOfShapes, dtype=d1.dtype)
+    newD2 = np.empty(3*numOfShapes, dtype=d2.dtype)
+    newD3 = np.empty(3*numOfShapes, dtype=d3.dtype)
+    newDensity = np.empty(3*numOfShapes, dtype=density.dtype)
+    newCount = np.zeros(3*numOfShapes, dtype=np.int64)
+    shapeRows = {}
+    numOfNewShapes = 0
+    for i in range(numOfShapes):
+        for side in range(3):
+            if splits[i, side] == 0:
+                continue
+            side1 = np.float64(d1[i])
+            side2 = np.float64(d2[i])
+            side3 = np.float64(d3[i])
+            if side == 0:
+                side1 = side1/2
+            elif side == 1:
+                side2 = side2/2
+            else:
+                side3 = side3/2
+            shape = (side1, side2, side3, np.float64(density[i]))
+            if shape in shapeRows:
+                row = shapeRows[shape]
+            else:
+                row = numOfNewShapes
+                shapeRows[shape] = row
+                newD1[row] = side1
+                newD2[row] = side2
+                newD3[row] = side3
+                newDensity[row] = density[i]
+                numOfNewShapes += 1
+            # Each bisected particle becomes 2 new particles
+            newCount[row] += 2*splits[i, side]
+    return (newD1[:numOfNewShapes].copy(), newD2[:numOfNewShapes].copy(),
+            newD3[:numOfNewShapes].copy(),
+            newDensity[:numOfNewShapes].copy(),
+            newCount[:numOfNewShapes].copy())
+
+
+@njit(cache=True, fastmath=True)
+def sumSurfaceAreaAndVolume(d1, d2, d3, count):
+    """
+    Compiled kernel behind model.characteristics(). Sums the surface area and
+    the volume of all particles in a single pass over the particle shapes.
+
+    Parameters
+    ----------
+    d1, d2, d3 : numpy arrays
+        The sides of the particle shapes.
+    count : numpy array
+        The number of particles with each shape.
+
+    Returns
+    -------
+    The total surface area and the total volume of the particles, and the
+    number of particles.
+
+    """
+    SAsum = 0.0
+    volumeSum = 0.0
+    numOfParticles = 0
+    for i in range(d1.shape[0]):
+        # The sides are stored as float32, so they're upcast to float64
+        # before the face areas, volume, and sums are computed
+        side1 = np.float64(d1[i])
+        side2 = np.float64(d2[i])
+        side3 = np.float64(d3[i])
+        SAsum += count[i]*((2*side1*side2) + (2*side2*side3)
+                           + (2*side3*side1))
+        volumeSum += count[i]*side1*side2*side3
+        numOfParticles += count[i]
+    return SAsum, volumeSum, numOfParticles
+
+
+@njit(cache=True, fastmath=True)
+def divideShapes(side1, side2, side3, density, count, picks, dividedSide):
+    """
+    Compiled kernel behind linearGrowthModel.createParticles(). Divides
+    picks[i] particles of each shape i along dividedSide. The divided
+    particles become a new shape with twice as many particles, which is
+    merged into an existing shape if one has the same sides. Shapes with no
+    particles left are dropped.
+
+    Parameters
+    ----------
+    side1, side2, side3, density, count : numpy arrays
+        The columns of the existing soil profile.
+    picks : numpy array
+        The number of particles of each shape that will be divided.
+    dividedSide : int
+        The side (1, 2, or 3) along which the particles are divided.
+
+    Returns
+    -------
+    The columns of the new soil profile, in the same order as the inputs.
+
+    """
+    numOfShapes = side1.shape[0]
+    newSide1 = np.empty(2*numOfShapes, dtype=side1.dtype)
+    newSide2 = np.empty(2*numOfShapes, dtype=side2.dtype)
+    newSide3 = np.empty(2*numOfShapes, dtype=side3.dtype)
+    newDensity = np.empty(2*numOfShapes, dtype=density.dtype)
+    newCount = np.zeros(2*numOfShapes, dtype=np.int64)
+    shapeRows = {}
+    numOfNewShapes = 0
+    # The particles that aren't divided keep their shape
+    for i in range(numOfShapes):
+        if count[i] == picks[i]:
+            continue
+        shape = (np.float64(side1[i]), np.float64(side2[i]),
+                 np.float64(side3[i]), np.float64(density[i]))
+        shapeRows[shape] = numOfNewShapes
+        newSide1[numOfNewShapes] = side1[i]
+        newSide2[numOfNewShapes] = side2[i]
+        newSide3[numOfNewShapes] = side3[i]
+        newDensity[numOfNewShapes] = density[i]
+        newCount[numOfNewShapes] = count[i] - picks[i]
+        numOfNewShapes += 1
+    for i in range(numOfShapes):
+        if picks[i] == 0:
+            continue
+        dividedSide1 = np.float64(side1[i])
+        dividedSide2 = np.float64(side2[i])
+        dividedSide3 = np.float64(side3[i])
+        if dividedSide == 1:
+            dividedSide1 = dividedSide1/2
+        elif dividedSide == 2:
+            dividedSide2 = dividedSide2/2
+        else:
+            dividedSide3 = dividedSide3/2
+        shape = (dividedSide1, dividedSide2, dividedSide3,
+                 np.float64(density[i]))
+        if shape in shapeRows:
+            row = shapeRows[shape]
+        else:
+            row = numOfNewShapes
+            shapeRows[shape] = row
+            newSide1[row] = dividedSide1
+            newSide2[row] = dividedSide2
+            newSide3[row] = dividedSide3
+            newDensity[row] = density[i]
+            numOfNewShapes += 1
+        # Each divided particle becomes 2 new particles
+        newCount[row] += 2*picks[i]
+    return (newSide1[:numOfNewShapes].copy(),
+            newSide2[:numOfNewShapes].copy(),
+            newSide3[:numOfNewShapes].copy(),
+            newDensity[:numOfNewShapes].copy(),
+            newCount[:numOfNewShapes].copy())
+
+
+@njit(cache=True, fastmath=True)
+def sumProfile(side1, side2, side3, density, count):
+    """
+    Sums the surface area, mass, and volume of all particles in a soil
+    profile in a single pass over the particle shapes.
+
+    Parameters
+    ----------
+    side1, side2, side3, density, count : numpy arrays
+        The columns of the soil profile.
+
+    Returns
+    -------
+    The total surface area, mass, and volume of the particles.
+
+    """
+    SAsum = 0.0
+    massSum = 0.0
+    volumeSum = 0.0
+    for i in range(side1.shape[0]):
+        # The sides are stored as float32, so they're upcast to float64
+        # before the face areas, volume, mass, and sums are computed
+        length1 = np.float64(side1[i])
+        length2 = np.float64(side2[i])
+        length3 = np.float64(side3[i])
+        area12 = length1*length2
+        area23 = length2*length3
+        area13 = length1*length3
+        volume = area12*length3
+        SAsum += count[i]*2*(area12 + area23 + area13)
+        massSum += count[i]*np.float64(density[i])*volume
+        volumeSum += count[i]*volume
+    return SAsum, massSum, volumeSum